@@ -5,21 +5,90 @@ from flask_cors import CORS
 from dotenv import load_dotenv
 import firebase_admin
 from firebase_admin import credentials, firestore, storage
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 from PyPDF2 import PdfReader
-import io
+import pypdfium2 as pdfium
+import pdf_worker
+import hashlib
+import html
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+import numpy as np
 import vertexai
 from vertexai.generative_models import GenerativeModel
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from vertexai.language_models import TextEmbeddingModel
+from vertexai.language_models import TextEmbeddingInput, TextEmbeddingModel
 from google.cloud.firestore_v1.vector import Vector
-import time
 from google.cloud.firestore_v1.base_vector_query import DistanceMeasure
-import markdown2
+from google.api_core.exceptions import ResourceExhausted
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
+import mistune
+import orjson
 
 # Load environment variables from .env file
 load_dotenv()
 
+# text-embedding-004 accepts up to 250 instances per request...
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "250"))
+# ...and at most 20k input tokens; ~60k characters stays safely under that
+EMBEDDING_BATCH_CHARS = int(os.getenv("EMBEDDING_BATCH_CHARS", "60000"))
+# Must match the dimension of the Firestore vector index
+EMBEDDING_DIMENSION = 768
+# Firestore rejects batches with more than 500 operations
+FIRESTORE_BATCH_LIMIT = 450
+# Number of Firestore batch commits allowed in flight at once
+FIRESTORE_COMMIT_WORKERS = 4
+# Number of embedding requests allowed in flight at once
+EMBEDDING_MAX_WORKERS = int(os.getenv("EMBEDDING_MAX_WORKERS", "5"))
+# PDFs with more pages than this are decoded in parallel
+PARALLEL_PAGE_THRESHOLD = 4
+# PDFium is not thread-safe; every in-process call must hold this lock
+PDFIUM_LOCK = threading.Lock()
+
+# Uploaded documents are processed in the background so /upload_pdf returns immediately.
+# For production, move this onto a proper task queue (Celery/RQ with Redis).
+POOL = ThreadPoolExecutor(max_workers=2)
+# Jobs don't survive a restart; documents queued ("uploaded") or "processing" for
+# longer than these, counted from their last status update, are marked failed
+QUEUE_TIMEOUT = timedelta(minutes=60)
+PROCESSING_TIMEOUT = timedelta(minutes=15)
+
+# Shared across uploads so the splitter is only configured once
+SPLITTER = RecursiveCharacterTextSplitter(
+    chunk_size=1000,  # Max 1000 characters per chunk
+    chunk_overlap=100,  # 100 characters of overlap
+    length_function=len,
+    is_separator_regex=False
+)
+
+# Extracted text up to this size is cached on the Firestore document itself
+# (documents are capped at 1 MiB); larger text is cached as a Storage blob.
+TEXT_CACHE_FIRESTORE_LIMIT = 900_000  # bytes
+
+# --- Markdown rendering ---
+MD = mistune.create_markdown(escape=True, plugins=['strikethrough', 'table'])
+MARKDOWN_SYNTAX_CHARS = "\n*`_#[|~\\"
+# Line-leading list, quote, heading-underline and indented-code markers
+MARKDOWN_BLOCK_START = re.compile(r"\s|[-+>=]|\d+[.)]")
+
+
+def render_card_text(text):
+    """
+    Renders a flashcard field, skipping the parser for plain one-line text.
+    The fast path produces the same <p> markup as the parser would.
+    """
+    if (not any(char in text for char in MARKDOWN_SYNTAX_CHARS)
+            and not MARKDOWN_BLOCK_START.match(text)):
+        return f"<p>{html.escape(text)}</p>\n"
+    return MD(text)
+
+
 # --- Firebase Initialization ---
 try:
     cred_path = os.getenv("GOOGLE_APPLICATION_CREDENTIALS")
@@ -63,11 +132,191 @@ except Exception as e:
     embedding_model = None
 
 
+
+def _wait_retry_after(retry_state):
+    """Honor the server's Retry-After header on 429s, else back off exponentially."""
+    exc = retry_state.outcome.exception()
+    response = getattr(exc, 'response', None)
+    retry_after = getattr(response, 'headers', {}).get('Retry-After') if response is not None else None
+    try:
+        return float(retry_after)
+    except (TypeError, ValueError):
+        return wait_exponential(multiplier=1, min=1, max=30)(retry_state)
+
+
+def _embedding_batches(texts):
+    """
+    Groups texts into request-sized batches, capped both by text count and by
+    total characters, preserving their order.
+    """
+    batches = []
+    current = []
+    current_chars = 0
+    for text in texts:
+        if current and (len(current) == EMBEDDING_BATCH_SIZE
+                        or current_chars + len(text) > EMBEDDING_BATCH_CHARS):
+            batches.append(current)
+            current = []
+            current_chars = 0
+        current.append(text)
+        current_chars += len(text)
+    if current:
+        batches.append(current)
+    return batches
+
+
+@retry(
+    retry=retry_if_exception_type(ResourceExhausted),
+    wait=_wait_retry_after,
+    stop=stop_after_attempt(5),
+    reraise=True
+)
+def embed_batch(texts, task_type="RETRIEVAL_DOCUMENT"):
+    """
+    Embeds a list of texts in a single request, retrying on rate limits.
+    The task type conditions the embeddings for documents vs. search queries.
+    """
+    inputs = [TextEmbeddingInput(text, task_type) for text in texts]
+    embeddings = embedding_model.get_embeddings(inputs, output_dimensionality=EMBEDDING_DIMENSION)
+    # Unit-length vectors let vector search use the cheaper dot product
+    return [_unit_vector(embedding.values).tolist() for embedding in embeddings]
+
+
+@lru_cache(maxsize=4096)
+def embed_question(text):
+    """
+    Embeds a user question; repeated questions are served from memory.
+    Cached as a read-only float32 array, ~3 KB per entry instead of ~25 KB of floats.
+    """
+    embedding = np.asarray(embed_batch([text], task_type="RETRIEVAL_QUERY")[0], dtype=np.float32)
+    embedding.setflags(write=False)
+    return embedding
+
+
+# --- Question cache ---
+# Exact repeats skip re-embedding via lru_cache; near-duplicate questions on the
+# same document reuse an earlier answer when their embeddings are close enough.
+# Answers are stored in SQLite with int8-quantized question embeddings, so the
+# cache is shared across worker processes and survives restarts.
+ANSWER_CACHE_DB = os.getenv("ANSWER_CACHE_DB", "answer_cache.sqlite3")
+QUESTION_CACHE_TTL = 3600  # seconds
+QUESTION_CACHE_SIMILARITY = 0.97
+
+
+def _answer_cache_connection():
+    return closing(sqlite3.connect(ANSWER_CACHE_DB, timeout=5))
+
+
+with _answer_cache_connection() as cache_db, cache_db:
+    cache_db.execute("PRAGMA journal_mode=WAL")
+    cache_db.execute("""
+        CREATE TABLE IF NOT EXISTS answer_cache (
+            doc_id TEXT NOT NULL,
+            embedding BLOB NOT NULL,
+            answer_html TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+    """)
+    cache_db.execute("CREATE INDEX IF NOT EXISTS answer_cache_doc ON answer_cache (doc_id, created_at)")
+
+
+def _unit_vector(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _quantize(vector):
+    # 127 * cosine similarity fits in int8 for unit vectors
+    return np.round(_unit_vector(vector) * 127).astype(np.int8)
+
+
+def get_cached_answer(doc_id, question_embedding):
+    """Returns a cached answer for a semantically equivalent question, if any."""
+    # Read-only, so lookups don't queue behind SQLite's single write lock
+    with _answer_cache_connection() as cache_db:
+        rows = cache_db.execute(
+            "SELECT embedding, answer_html FROM answer_cache WHERE doc_id = ? AND created_at >= ?",
+            (doc_id, time.time() - QUESTION_CACHE_TTL)
+        ).fetchall()
+    if not rows:
+        return None
+
+    cached = np.frombuffer(b"".join(row[0] for row in rows), dtype=np.int8).reshape(len(rows), -1)
+    query = _quantize(question_embedding).astype(np.int32)
+    similarities = cached.astype(np.int32) @ query / (127 * 127)
+    best = int(np.argmax(similarities))
+    if similarities[best] >= QUESTION_CACHE_SIMILARITY:
+        return rows[best][1]
+    return None
+
+
+def cache_answer(doc_id, question_embedding, answer_html):
+    now = time.time()
+    with _answer_cache_connection() as cache_db, cache_db:
+        # Purge expired answers while already holding the write lock
+        cache_db.execute(
+            "DELETE FROM answer_cache WHERE created_at < ?",
+            (now - QUESTION_CACHE_TTL,)
+        )
+        cache_db.execute(
+            "INSERT INTO answer_cache (doc_id, embedding, answer_html, created_at) VALUES (?, ?, ?, ?)",
+            (doc_id, _quantize(question_embedding).tobytes(), answer_html, now)
+        )
+
+
 # ------------------------------------
 
+def _pdfium_pages_text(pdf, start, stop):
+    """Extracts the text of pages [start, stop), closing native handles as it goes."""
+    pages_text = []
+    for index in range(start, stop):
+        page = pdf[index]
+        textpage = page.get_textpage()
+        pages_text.append(textpage.get_text_range())
+        textpage.close()
+        page.close()
+    return pages_text
+
+
+def extract_text_with_pdfium(pdf_path):
+    """
+    Extracts the text of every page using PDFium. Larger PDFs are split into
+    page ranges that the pdf_worker pool decodes in parallel, preserving page order.
+    """
+    with PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(pdf_path)
+        try:
+            page_count = len(pdf)
+            if page_count <= PARALLEL_PAGE_THRESHOLD:
+                pages_text = _pdfium_pages_text(pdf, 0, page_count)
+                return "".join(text + "\n" for text in pages_text)
+        finally:
+            pdf.close()
+
+    pages_text = pdf_worker.extract_pages_in_parallel(pdf_path, page_count)
+    return "".join(text + "\n" for text in pages_text)
+
+
+def cache_extracted_text(doc_ref, storage_path, full_text):
+    """
+    Saves extracted text so later requests don't re-download and re-parse the PDF.
+    """
+    try:
+        if len(full_text.encode('utf-8')) <= TEXT_CACHE_FIRESTORE_LIMIT:
+            doc_ref.update({'text_content': full_text})
+        else:
+            text_path = f"{storage_path.rsplit('/', 1)[0]}/text.txt"
+            bucket.blob(text_path).upload_from_string(full_text, content_type='text/plain')
+            doc_ref.update({'text_path': text_path})
+    except Exception as e:
+        print(f"Could not cache extracted text: {e}")
+
+
 def extract_text_from_pdf(document_id):
     """
-    Downloads a PDF from Firebase Storage, extracts its text, and returns it.
+    Returns the text of a document, from the cache if it was already extracted,
+    otherwise by downloading the PDF from Firebase Storage and parsing it.
     """
     try:
         # 1. Get the document metadata from Firestore
@@ -78,26 +327,39 @@ def extract_text_from_pdf(document_id):
             print(f"Error: Document with ID {document_id} not found in Firestore.")
             return None
 
-        # 2. Get the file path
-        storage_path = doc_snapshot.to_dict().get('storage_path')
+        # 2. Return the cached text if this document was already extracted
+        doc_data = doc_snapshot.to_dict()
+        if doc_data.get('text_content') is not None:
+            return doc_data['text_content']
+        if doc_data.get('text_path'):
+            return bucket.blob(doc_data['text_path']).download_as_text()
+
+        # 3. Get the file path
+        storage_path = doc_data.get('storage_path')
         if not storage_path:
             print(f"Error: storage_path not found for document {document_id}.")
             return None
 
-        # 3. Download the file from Firebase Storage into memory
+        # 4. Stream the file from Firebase Storage to a temporary file, so neither
+        # this process nor the PDF workers hold the whole PDF in memory
         blob = bucket.blob(storage_path)
-        pdf_content_in_memory = io.BytesIO(blob.download_as_bytes())
-        print(f"Successfully downloaded {storage_path} from Firebase Storage.")
-
-        # 4. Use PyPDF2 to read the in-memory PDF
-        pdf_reader = PdfReader(pdf_content_in_memory)
-
-        # 5. Extract text from each page
-        full_text = ""
-        for page in pdf_reader.pages:
-            full_text += page.extract_text() + "\n"
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+            blob.download_to_file(pdf_file)
+            pdf_file.flush()
+            print(f"Successfully downloaded {storage_path} from Firebase Storage.")
+
+            # 5. Extract text from each page with PDFium, falling back to PyPDF2
+            try:
+                full_text = extract_text_with_pdfium(pdf_file.name)
+            except Exception as e:
+                print(f"pypdfium2 failed ({e}), falling back to PyPDF2.")
+                pdf_reader = PdfReader(pdf_file.name)
+                full_text = ""
+                for page in pdf_reader.pages:
+                    full_text += page.extract_text() + "\n"
 
         print(f"Successfully extracted {len(full_text)} characters of text.")
+        cache_extracted_text(doc_ref, storage_path, full_text)
         return full_text
 
     except Exception as e:
@@ -105,6 +367,22 @@ def extract_text_from_pdf(document_id):
         return None
 
 
+def dedupe_chunks(chunks):
+    """
+    Returns (unique_chunks, chunk_index) such that chunks[i] == unique_chunks[chunk_index[i]].
+    """
+    seen = {}
+    unique_chunks = []
+    chunk_index = []
+    for chunk in chunks:
+        key = hashlib.blake2b(chunk.encode('utf-8'), digest_size=16).digest()
+        if key not in seen:
+            seen[key] = len(unique_chunks)
+            unique_chunks.append(chunk)
+        chunk_index.append(seen[key])
+    return unique_chunks, chunk_index
+
+
 # --- Function to create and store embeddings ---
 def create_and_store_embeddings(document_id, text_content):
     """
@@ -117,34 +395,52 @@ def create_and_store_embeddings(document_id, text_content):
 
     try:
         # 1. Chunk the text
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,  # Max 1000 characters per chunk
-            chunk_overlap=100  # 100 characters of overlap
-        )
-        chunks = text_splitter.split_text(text_content)
+        chunks = SPLITTER.split_text(text_content)
         print(f"Text chunked into {len(chunks)} pieces.")
 
-        # 2. Create embeddings and store in Firestore
+        # 2. Get the vector embeddings of each distinct chunk, several batch requests
+        # in flight at once. Each batch retries on its own, and map() returns results
+        # in batch order.
+        unique_chunks, chunk_index = dedupe_chunks(chunks)
+        print(f"Embedding {len(unique_chunks)} distinct chunks.")
+        chunk_batches = _embedding_batches(unique_chunks)
+        unique_vectors = []
+        with ThreadPoolExecutor(max_workers=EMBEDDING_MAX_WORKERS) as executor:
+            for batch_vectors in executor.map(embed_batch, chunk_batches):
+                unique_vectors.extend(batch_vectors)
+        # Repeated chunks (headers, footers, boilerplate) share one vector
+        embedding_vectors = [unique_vectors[j] for j in chunk_index]
+
+        # 3. Store the embeddings in Firestore, committing full batches in parallel
         batch = db.batch()
+        pending_writes = 0
         # Create a new subcollection for this document's embeddings
         embeddings_collection = db.collection('documents').document(document_id).collection('embeddings')
 
-        for i, chunk in enumerate(chunks):
-            # 3. Get the vector embedding from the Google AI model
-            # Note: The API has a limit of 5 requests per second
-            time.sleep(0.2)  # 200ms delay to respect rate limits
-            response = embedding_model.get_embeddings([chunk])
-            embedding_vector = response[0].values
-
-            # 4. Create a new document in the "embeddings" subcollection
-            doc_ref = embeddings_collection.document(f"chunk_{i}")
-            batch.set(doc_ref, {
-                'text_chunk': chunk,
-                'embedding': Vector(embedding_vector)  # Use the Vector type
-            })
-
-        # 5. Commit the batch
-        batch.commit()
+        with ThreadPoolExecutor(max_workers=FIRESTORE_COMMIT_WORKERS) as executor:
+            commits = []
+            for i, (chunk, embedding_vector) in enumerate(zip(chunks, embedding_vectors)):
+                # 4. Create a new document in the "embeddings" subcollection
+                doc_ref = embeddings_collection.document(f"chunk_{i}")
+                batch.set(doc_ref, {
+                    'text_chunk': chunk,
+                    'embedding': Vector(embedding_vector)  # Use the Vector type
+                })
+                pending_writes += 1
+
+                # Flush before hitting Firestore's per-batch operation limit
+                if pending_writes == FIRESTORE_BATCH_LIMIT:
+                    commits.append(executor.submit(batch.commit))
+                    batch = db.batch()
+                    pending_writes = 0
+
+            # 5. Commit the remaining writes
+            if pending_writes:
+                commits.append(executor.submit(batch.commit))
+
+            # Surface the first failed commit, if any
+            for commit in as_completed(commits):
+                commit.result()
         print(f"Successfully stored {len(chunks)} embeddings in Firestore.")
 
         # 6. Update the main document's status
@@ -157,6 +453,33 @@ def create_and_store_embeddings(document_id, text_content):
         return False
 
 
+# --- Background processing of uploaded documents ---
+def process_document(document_id):
+    """
+    Extracts the text of an uploaded document and creates its embeddings.
+    Runs on the background POOL; progress is tracked in the document's status field.
+    """
+    print(f"Starting embedding process for {document_id}...")
+    doc_ref = db.collection('documents').document(document_id)
+    try:
+        # The processing timeout counts from here, not from the upload
+        doc_ref.update({'status': 'processing', 'status_updated_at': firestore.SERVER_TIMESTAMP})
+        text_content = extract_text_from_pdf(document_id)
+        if text_content:
+            # Restart the timeout before the (possibly long) embedding step
+            doc_ref.update({'status_updated_at': firestore.SERVER_TIMESTAMP})
+            if create_and_store_embeddings(document_id, text_content):
+                return
+    except Exception as e:
+        print(f"An error occurred while processing {document_id}: {e}")
+
+    print(f"Could not process {document_id} to create embeddings.")
+    try:
+        doc_ref.update({'status': 'failed'})
+    except Exception as e:
+        print(f"An error occurred while marking {document_id} as failed: {e}")
+
+
 # ----------------------------------------------------
 
 # --- Flask App Initialization ---
@@ -207,21 +530,16 @@ def upload_pdf():
                 'status': 'uploaded'  # Set initial status
             })
 
-            # 7. Start the embedding process
-            print(f"Starting embedding process for {doc_id}...")
-            text_content = extract_text_from_pdf(doc_id)
-            if text_content:
-                create_and_store_embeddings(doc_id, text_content)
-            else:
-                print(f"Could not extract text for {doc_id} to create embeddings.")
+            # 7. Start the embedding process in the background
+            POOL.submit(process_document, doc_id)
             # ---------------------------
 
-            # 8. Return success response
+            # 8. Return accepted response; clients poll /status/<doc_id>
             return jsonify({
-                "status": "success",
+                "status": "processing",
                 "message": "PDF uploaded and processing started!",  # Updated message
                 "document_id": doc_id
-            }), 201
+            }), 202
 
         except Exception as e:
             return jsonify({"status": "error", "message": f"An error occurred: {e}"}), 500
@@ -231,6 +549,33 @@ def upload_pdf():
 
 # ---------------------------------------
 
+@app.route('/status/<string:doc_id>', methods=['GET'])
+def document_status(doc_id):
+    """Reports the processing status of an uploaded document."""
+    doc_ref = db.collection('documents').document(doc_id)
+    # Clients poll this; skip the cached text_content (up to ~900 KB)
+    doc_snapshot = doc_ref.get(field_paths=['status', 'status_updated_at', 'created_at'])
+    if not doc_snapshot.exists:
+        return jsonify({"status": "error", "message": "Document not found."}), 404
+
+    doc_data = doc_snapshot.to_dict()
+    processing_status = doc_data.get('status')
+
+    # A job lost to a worker restart would otherwise stay "uploaded" or "processing" forever
+    timeout = {'uploaded': QUEUE_TIMEOUT, 'processing': PROCESSING_TIMEOUT}.get(processing_status)
+    status_updated_at = doc_data.get('status_updated_at') or doc_data.get('created_at')
+    if (timeout and status_updated_at
+            and datetime.now(timezone.utc) - status_updated_at > timeout):
+        doc_ref.update({'status': 'failed'})
+        processing_status = 'failed'
+
+    return jsonify({
+        "status": "success",
+        "document_id": doc_id,
+        "document_status": processing_status
+    })
+
+
 @app.route('/get_text/<string:doc_id>', methods=['GET'])
 def get_pdf_text(doc_id):
     """A simple endpoint to test our text extraction function."""
@@ -267,7 +612,7 @@ def summarize_pdf(doc_id):
 
     try:
         response = model.generate_content(prompt)
-        summary_html = markdown2.markdown(response.text)
+        summary_html = MD(response.text)
         return render_template('summary.html', summary_html=summary_html)
     except Exception as e:
         error_message = f"An error occurred with the AI model: {e}"
@@ -300,16 +645,20 @@ def generate_flashcards(doc_id):
 
     try:
         response = model.generate_content(prompt)
-        cleaned_response = response.text.strip().replace("```json", "").replace("```", "")
-        import json
-        flashcards_data = json.loads(cleaned_response)
+        # Slice out the JSON array, ignoring any ```json fences around it
+        response_text = response.text
+        start = response_text.find('[')
+        end = response_text.rfind(']') + 1
+        if start == -1 or end <= start:
+            raise ValueError("Model did not return a JSON array.")
+        flashcards_data = orjson.loads(response_text[start:end])
 
         # Convert question and answer fields from Markdown to HTML
         for card in flashcards_data:
             if 'question' in card:
-                card['question'] = markdown2.markdown(card['question'])
+                card['question'] = render_card_text(card['question'])
             if 'answer' in card:
-                card['answer'] = markdown2.markdown(card['answer'])
+                card['answer'] = render_card_text(card['answer'])
         # ----------------
 
         return render_template('flashcards.html', flashcards=flashcards_data)
@@ -332,7 +681,15 @@ def ask_question(doc_id):
 
     try:
         # 2. Embed the user's question using the same model
-        question_embedding = embedding_model.get_embeddings([question])[0].values
+        question_embedding = embed_question(question)
+
+        # Reuse the answer to an equivalent earlier question, skipping Gemini entirely
+        cached_answer = get_cached_answer(doc_id, question_embedding)
+        if cached_answer:
+            return jsonify({
+                "status": "success",
+                "answer": cached_answer
+            })
 
         # 3. Find the most relevant text chunks from Firestore
         embeddings_collection = db.collection('documents').document(doc_id).collection('embeddings')
@@ -340,8 +697,8 @@ def ask_question(doc_id):
         # Use the find_nearest method to perform a vector search
         query = embeddings_collection.find_nearest(
             vector_field="embedding",
-            query_vector=Vector(question_embedding),
-            distance_measure=DistanceMeasure.EUCLIDEAN,  # Must match your index!
+            query_vector=Vector(question_embedding.tolist()),
+            distance_measure=DistanceMeasure.DOT_PRODUCT,  # Embeddings are L2-normalized
             limit=5  # Get the top 5 most relevant chunks
         )
 
@@ -369,7 +726,8 @@ def ask_question(doc_id):
 
         # 5. Generate the answer from Gemini
         response = model.generate_content(prompt)
-        answer_html = markdown2.markdown(response.text)
+        answer_html = MD(response.text)
+        cache_answer(doc_id, question_embedding, answer_html)
 
         return jsonify({
             "status": "success",
@@ -380,5 +738,7 @@ def ask_question(doc_id):
         print(f"An error occurred in /ask_question: {e}")
         return jsonify({"status": "error", "answer": f"An error occurred: {e}"}), 500
 
-if __name__ == '__main__':
-    app.run(debug=True, port=5000)
+# No `python app.py` entry point: the PDF worker pool's child processes re-run
+# the __main__ script, which would re-initialize Firebase and Vertex AI in every
+# worker. Start the app with `gunicorn app:app`, or for development
+# `flask --app app run --debug --port 5000`.
@@ -0,0 +1,15 @@
+# Gunicorn settings, picked up automatically when running `gunicorn app:app`
+# from this directory. Each worker process serves several requests at once on
+# threads, so a slow PDF upload or LLM call no longer blocks other users.
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+# Each worker runs its own PDF process pool and background ingest threads, so
+# keep the process count low and get concurrency from threads instead
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+# Workers inherit this, so pdf_worker can split the CPUs between them
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+# LLM calls and PDF processing can take a while
+timeout = 120
@@ -1,14 +1,33 @@
+import hashlib
+import html
 import os
+import re
+import sqlite3
+import threading
+import time
 import uuid
+from contextlib import closing, contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import numpy as np
+import orjson
+import httpx
 import psycopg2
-import requests
-import markdown2
+from psycopg2.extras import execute_values
+from psycopg2.pool import ThreadedConnectionPool
+from pgvector.psycopg2 import register_vector
+import mistune
 from flask import Flask, request, jsonify, render_template
 from flask_cors import CORS
 from dotenv import load_dotenv
 from pypdf import PdfReader
+import pypdfium2 as pdfium
+import pdf_worker
 from langchain_text_splitters import RecursiveCharacterTextSplitter
+import torch
 from sentence_transformers import SentenceTransformer
+from transformers import AutoTokenizer
+from sklearn.cluster import KMeans
 
 # --------------------------------------------------
 # ENV
@@ -25,16 +44,218 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 # --------------------------------------------------
 # DB
 # --------------------------------------------------
-conn = psycopg2.connect(SUPABASE_DB_URL, sslmode="require")
-conn.autocommit = True
+# Schema changes and indexes live in migrate.py (run once per deploy).
+# pgvector applies the document_id filter after the HNSW scan; iterative scans
+# keep walking the index until LIMIT rows match, instead of returning only the
+# document's share of the first ef_search neighbours (requires pgvector >= 0.8).
+def pgvector_version(cur):
+    """(major, minor) of the installed pgvector extension."""
+    cur.execute("SELECT extversion FROM pg_extension WHERE extname='vector'")
+    row = cur.fetchone()
+    return tuple(int(part) for part in row[0].split(".")[:2]) if row else (0, 0)
+
+class VectorConnection(psycopg2.extensions.connection):
+    """Autocommit connection configured for pgvector search."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.autocommit = True
+
+        with self.cursor() as cur:
+            # Decide by version: before pgvector is loaded, Postgres accepts any hnsw.*
+            # setting as a placeholder, and older versions later drop it with only a warning
+            if pgvector_version(cur) >= (0, 8):
+                cur.execute("SET hnsw.iterative_scan = strict_order")
+            else:
+                # Older pgvector: forbid plain index scans, so searches go through a bitmap
+                # scan of the document_id index and an exact sort (HNSW has no bitmap scan)
+                print("HNSW ITERATIVE SCAN UNAVAILABLE (pgvector < 0.8), disabling index scans for search")
+                cur.execute("SET enable_indexscan = off")
+
+        # Send numpy arrays as native pgvector values instead of text literals
+        register_vector(self)
+
+# psycopg2 runs one statement at a time per connection, so request threads and
+# background jobs each borrow their own. Sized for the gunicorn threads plus the
+# two POOL workers; a borrow beyond that raises PoolError instead of waiting.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", int(os.getenv("GUNICORN_THREADS", "8")) + 2))
+DB_POOL = ThreadedConnectionPool(
+    1,
+    DB_POOL_SIZE,
+    SUPABASE_DB_URL,
+    sslmode="require",
+    connection_factory=VectorConnection
+)
+
+@contextmanager
+def db_cursor():
+    """Borrows a pooled connection for the duration of the with-block."""
+    conn = DB_POOL.getconn()
+    try:
+        with conn.cursor() as cur:
+            yield cur
+    finally:
+        # Discard connections the server dropped, so the pool reconnects
+        DB_POOL.putconn(conn, close=bool(conn.closed))
 
 # --------------------------------------------------
 # LOCAL EMBEDDINGS
 # --------------------------------------------------
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
+# On a GPU (CUDA / Apple MPS) run the SentenceTransformer there. On CPU prefer an
+# OpenVINO or int8-quantized ONNX export of all-MiniLM-L6-v2 (see README), which
+# run several times faster; fall back to the PyTorch SentenceTransformer.
+OPENVINO_MODEL_DIR = os.getenv("OPENVINO_MODEL_DIR", "ov_model")
+ONNX_MODEL_DIR = os.getenv("ONNX_MODEL_DIR", "onnx_model_quantized")
+ONNX_MODEL_FILE = os.getenv("ONNX_MODEL_FILE", "model_quantized.onnx")
+# `optimum-cli onnxruntime quantize` doesn't copy the tokenizer files into
+# ONNX_MODEL_DIR, so load the (identical) tokenizer of the source model
+ONNX_TOKENIZER = os.getenv("ONNX_TOKENIZER", "sentence-transformers/all-MiniLM-L6-v2")
+# SentenceTransformer's max_seq_length for all-MiniLM-L6-v2; the exported
+# tokenizer would otherwise truncate at 512 and produce different vectors
+MAX_SEQ_LENGTH = 256
+
+def load_cpu_feature_model():
+    if os.path.isdir(OPENVINO_MODEL_DIR):
+        from optimum.intel import OVModelForFeatureExtraction
+        return (
+            OVModelForFeatureExtraction.from_pretrained(OPENVINO_MODEL_DIR, compile=True),
+            AutoTokenizer.from_pretrained(OPENVINO_MODEL_DIR)
+        )
+
+    if not os.path.isdir(ONNX_MODEL_DIR):
+        raise FileNotFoundError(f"No OpenVINO or ONNX export found in {OPENVINO_MODEL_DIR} or {ONNX_MODEL_DIR}")
+
+    from optimum.onnxruntime import ORTModelForFeatureExtraction
+    return (
+        ORTModelForFeatureExtraction.from_pretrained(
+            ONNX_MODEL_DIR,
+            file_name=ONNX_MODEL_FILE,
+            provider="CPUExecutionProvider"
+        ),
+        AutoTokenizer.from_pretrained(ONNX_TOKENIZER)
+    )
+
+if torch.cuda.is_available():
+    device = "cuda"
+elif torch.backends.mps.is_available():
+    device = "mps"
+else:
+    device = "cpu"
+
+feature_model = None
+tokenizer = None
+embedder = None
+
+if device == "cpu":
+    try:
+        feature_model, tokenizer = load_cpu_feature_model()
+    except Exception as e:
+        print("OPTIMIZED CPU EMBEDDINGS UNAVAILABLE, using SentenceTransformer:", e)
+
+if feature_model is None:
+    embedder = SentenceTransformer("all-MiniLM-L6-v2", device=device)
+
+def embed_texts(texts, batch_size=64):
+    """Returns an (n, 384) array of L2-normalized embeddings."""
+    if feature_model is None:
+        return embedder.encode(
+            texts,
+            batch_size=batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+
+    batches = []
+    for start in range(0, len(texts), batch_size):
+        inputs = tokenizer(
+            texts[start:start + batch_size],
+            padding=True,
+            truncation=True,
+            max_length=MAX_SEQ_LENGTH,
+            return_tensors="np"
+        )
+        hidden = feature_model(**inputs).last_hidden_state
+
+        # Mean-pool over real tokens, then L2-normalize
+        mask = inputs["attention_mask"][..., None].astype(np.float32)
+        pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        batches.append(pooled / np.linalg.norm(pooled, axis=1, keepdims=True))
 
-def embed_text(text):
-    return embedder.encode(text).tolist()
+    return np.concatenate(batches) if batches else np.empty((0, 384), dtype=np.float32)
+
+@lru_cache(maxsize=4096)
+def embed_question(text):
+    # Cached as a read-only float32 array (~1.5 KB) rather than a tuple of floats
+    embedding = np.array(embed_texts([text])[0], dtype=np.float32)
+    embedding.setflags(write=False)
+    return embedding
+
+# --------------------------------------------------
+# QUESTION CACHE
+# --------------------------------------------------
+# Exact repeats skip re-embedding via lru_cache; near-duplicate questions on the
+# same document reuse an earlier answer when their embeddings are close enough.
+# Answers are stored in SQLite with int8-quantized question embeddings, so the
+# cache is shared across worker processes and survives restarts.
+ANSWER_CACHE_DB = os.getenv("ANSWER_CACHE_DB", "answer_cache.sqlite3")
+QUESTION_CACHE_TTL = 3600  # seconds
+QUESTION_CACHE_SIMILARITY = 0.97
+
+def _answer_cache_connection():
+    return closing(sqlite3.connect(ANSWER_CACHE_DB, timeout=5))
+
+with _answer_cache_connection() as cache_db, cache_db:
+    cache_db.execute("PRAGMA journal_mode=WAL")
+    cache_db.execute("""
+        CREATE TABLE IF NOT EXISTS answer_cache (
+            doc_id TEXT NOT NULL,
+            embedding BLOB NOT NULL,
+            answer_html TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+    """)
+    cache_db.execute("CREATE INDEX IF NOT EXISTS answer_cache_doc ON answer_cache (doc_id, created_at)")
+
+def _unit_vector(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def _quantize(vector):
+    # 127 * cosine similarity fits in int8 for unit vectors
+    return np.round(_unit_vector(vector) * 127).astype(np.int8)
+
+def get_cached_answer(doc_id, question_embedding):
+    # Read-only, so lookups don't queue behind SQLite's single write lock
+    with _answer_cache_connection() as cache_db:
+        rows = cache_db.execute(
+            "SELECT embedding, answer_html FROM answer_cache WHERE doc_id = ? AND created_at >= ?",
+            (doc_id, time.time() - QUESTION_CACHE_TTL)
+        ).fetchall()
+    if not rows:
+        return None
+
+    cached = np.frombuffer(b"".join(row[0] for row in rows), dtype=np.int8).reshape(len(rows), -1)
+    query = _quantize(question_embedding).astype(np.int32)
+    similarities = cached.astype(np.int32) @ query / (127 * 127)
+    best = int(np.argmax(similarities))
+    if similarities[best] >= QUESTION_CACHE_SIMILARITY:
+        return rows[best][1]
+    return None
+
+def cache_answer(doc_id, question_embedding, answer_html):
+    now = time.time()
+    with _answer_cache_connection() as cache_db, cache_db:
+        # Purge expired answers while already holding the write lock
+        cache_db.execute(
+            "DELETE FROM answer_cache WHERE created_at < ?",
+            (now - QUESTION_CACHE_TTL,)
+        )
+        cache_db.execute(
+            "INSERT INTO answer_cache (doc_id, embedding, answer_html, created_at) VALUES (?, ?, ?, ?)",
+            (doc_id, _quantize(question_embedding).tobytes(), answer_html, now)
+        )
 
 # --------------------------------------------------
 # GROQ LLM
@@ -44,8 +265,15 @@ HEADERS = {
     "Content-Type": "application/json"
 }
 
+# Keep-alive HTTP/2 connection pool, so chat turns skip the TCP+TLS handshake
+SESSION = httpx.Client(
+    http2=True,
+    timeout=60,
+    limits=httpx.Limits(max_keepalive_connections=20)
+)
+
 def groq_generate(prompt):
-    res = requests.post(
+    res = SESSION.post(
         f"{GROQ_BASE_URL}/chat/completions",
         headers=HEADERS,
         json={
@@ -65,13 +293,193 @@ def groq_generate(prompt):
 # --------------------------------------------------
 # PDF UTILS
 # --------------------------------------------------
+PARALLEL_PAGE_THRESHOLD = 4
+
+# PDFium is not thread-safe: every in-process call goes through PDFIUM_LOCK,
+# and large PDFs are split into page ranges decoded by the pdf_worker pool
+PDFIUM_LOCK = threading.Lock()
+
+def extract_pages_with_pdfium(path):
+    with PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(path)
+        page_count = len(pdf)
+        pdf.close()
+
+        if page_count <= PARALLEL_PAGE_THRESHOLD:
+            return pdf_worker.extract_page_range(path, 0, page_count)
+
+    return pdf_worker.extract_pages_in_parallel(path, page_count)
+
 def extract_text_from_pdf(path):
-    reader = PdfReader(path)
-    return "\n".join(
-        page.extract_text()
-        for page in reader.pages
-        if page.extract_text()
-    )
+    try:
+        pages = extract_pages_with_pdfium(path)
+    except Exception as e:
+        print("PDFIUM ERROR, falling back to pypdf:", e)
+        pages = [page.extract_text() for page in PdfReader(path).pages]
+
+    return "\n".join(text for text in pages if text)
+
+def get_document_text(doc_id):
+    with db_cursor() as cur:
+        cur.execute(
+            "SELECT text_content FROM documents WHERE id=%s",
+            (doc_id,)
+        )
+        row = cur.fetchone()
+        if row and row[0]:
+            return row[0]
+
+        # Documents uploaded before text caching only have their chunks
+        cur.execute(
+            "SELECT content FROM embeddings WHERE document_id=%s ORDER BY chunk_index",
+            (doc_id,)
+        )
+        return " ".join(r[0] for r in cur.fetchall())
+
+# Roughly 6k tokens, leaving room for the prompt and answer in an 8k window
+MAX_PROMPT_CHARS = 24000
+SUMMARY_CLUSTERS = 10
+
+def get_prompt_text(doc_id):
+    """Full document text, or one representative chunk per topic if it's too long."""
+    with db_cursor() as cur:
+        cur.execute(
+            "SELECT representative_text FROM documents WHERE id=%s",
+            (doc_id,)
+        )
+        row = cur.fetchone()
+    if row and row[0]:
+        return row[0]
+
+    text = get_document_text(doc_id)
+    if len(text) <= MAX_PROMPT_CHARS:
+        return text
+
+    with db_cursor() as cur:
+        cur.execute(
+            "SELECT content, embedding FROM embeddings WHERE document_id=%s ORDER BY chunk_index",
+            (doc_id,)
+        )
+        rows = cur.fetchall()
+    if len(rows) <= SUMMARY_CLUSTERS:
+        return text[:MAX_PROMPT_CHARS]
+
+    # Cluster the chunk embeddings and keep the chunk nearest each centroid,
+    # in document order
+    vectors = np.stack([np.asarray(row[1], dtype=np.float32) for row in rows])
+    kmeans = KMeans(n_clusters=SUMMARY_CLUSTERS, n_init="auto", random_state=0).fit(vectors)
+    distances = np.linalg.norm(vectors[:, None, :] - kmeans.cluster_centers_[None, :, :], axis=2)
+    nearest = sorted(set(np.argmin(distances, axis=0).tolist()))
+    representative_text = "\n\n".join(rows[i][0] for i in nearest)
+
+    # Cache the selection so KMeans only runs once per document
+    with db_cursor() as cur:
+        cur.execute(
+            "UPDATE documents SET representative_text=%s WHERE id=%s",
+            (representative_text, doc_id)
+        )
+    return representative_text
+
+# --------------------------------------------------
+# BACKGROUND PROCESSING
+# --------------------------------------------------
+SPLITTER = RecursiveCharacterTextSplitter(
+    chunk_size=1000,
+    chunk_overlap=100,
+    length_function=len,
+    is_separator_regex=False
+)
+
+# Uploads are processed off the request thread; clients poll /status/<doc_id>.
+# Jobs don't survive a worker restart, so documents stuck "uploaded" (queued)
+# for QUEUE_TIMEOUT_MINUTES, or "processing" for PROCESSING_TIMEOUT_MINUTES
+# since the job's last step, are reported (and marked) as failed.
+# For production, move this onto a task queue (Celery/RQ with Redis).
+POOL = ThreadPoolExecutor(max_workers=2)
+QUEUE_TIMEOUT_MINUTES = 60
+PROCESSING_TIMEOUT_MINUTES = 15
+
+def set_document_status(doc_id, status):
+    with db_cursor() as cur:
+        cur.execute(
+            "UPDATE documents SET status=%s, status_updated_at=now() WHERE id=%s",
+            (status, doc_id)
+        )
+
+def dedupe_chunks(chunks):
+    """Returns (unique_chunks, chunk_index) with chunks[i] == unique_chunks[chunk_index[i]]."""
+    seen = {}
+    unique_chunks = []
+    chunk_index = []
+    for chunk in chunks:
+        key = hashlib.blake2b(chunk.encode("utf-8"), digest_size=16).digest()
+        if key not in seen:
+            seen[key] = len(unique_chunks)
+            unique_chunks.append(chunk)
+        chunk_index.append(seen[key])
+    return unique_chunks, chunk_index
+
+def process_document(doc_id, path):
+    try:
+        # The processing timeout counts from here, not from the upload
+        set_document_status(doc_id, "processing")
+
+        # Postgres TEXT can't hold NUL characters
+        text = extract_text_from_pdf(path).replace("\x00", "")
+
+        # Keep the full text so later endpoints don't re-parse the PDF, and
+        # restart the timeout before the (possibly long) embedding step
+        with db_cursor() as cur:
+            cur.execute(
+                "UPDATE documents SET text_content=%s, status_updated_at=now() WHERE id=%s",
+                (text, doc_id)
+            )
+
+        chunks = SPLITTER.split_text(text)
+
+        # Embed repeated chunks (headers, footers, boilerplate) only once
+        unique_chunks, chunk_index = dedupe_chunks(chunks)
+        embeddings = embed_texts(unique_chunks)[chunk_index]
+
+        rows = [
+            (doc_id, i, chunk, emb)
+            for i, (chunk, emb) in enumerate(zip(chunks, embeddings))
+        ]
+        with db_cursor() as cur:
+            # One round-trip per 500 rows instead of one per chunk
+            execute_values(
+                cur,
+                "INSERT INTO embeddings (document_id, chunk_index, content, embedding) VALUES %s",
+                rows,
+                template="(%s,%s,%s,%s::vector)",
+                page_size=500
+            )
+
+        set_document_status(doc_id, "processed")
+
+    except Exception as e:
+        print("PROCESSING ERROR:", e)
+        try:
+            set_document_status(doc_id, "failed")
+        except Exception as status_error:
+            # Nothing reads this job's future, so log instead of raising
+            print("STATUS UPDATE ERROR:", status_error)
+
+# --------------------------------------------------
+# MARKDOWN
+# --------------------------------------------------
+MD = mistune.create_markdown(escape=True, plugins=["strikethrough", "table"])
+MARKDOWN_SYNTAX_CHARS = "\n*`_#[|~\\"
+# Line-leading list, quote, heading-underline and indented-code markers
+MARKDOWN_BLOCK_START = re.compile(r"\s|[-+>=]|\d+[.)]")
+
+def render_card_text(text):
+    # Most flashcard answers are one plain line; skip the parser for those,
+    # producing the same <p> markup the parser would
+    if (not any(char in text for char in MARKDOWN_SYNTAX_CHARS)
+            and not MARKDOWN_BLOCK_START.match(text)):
+        return f"<p>{html.escape(text)}</p>\n"
+    return MD(text)
 
 # --------------------------------------------------
 # FLASK
@@ -98,65 +506,78 @@ def upload_pdf():
         path = os.path.join(UPLOAD_FOLDER, filename)
         pdf.save(path)
 
-        cur = conn.cursor()
-        cur.execute(
-            "INSERT INTO documents (id, user_id, file_name) VALUES (%s,%s,%s)",
-            (doc_id, "temp_user", filename)
-        )
-
-        text = extract_text_from_pdf(path)
-
-        splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=100
-        )
-        chunks = splitter.split_text(text)
-
-        for chunk in chunks:
-            emb = embed_text(chunk)
+        with db_cursor() as cur:
             cur.execute(
-                "INSERT INTO embeddings (document_id, content, embedding) VALUES (%s,%s,%s)",
-                (doc_id, chunk, emb)
+                "INSERT INTO documents (id, user_id, file_name, status, status_updated_at) VALUES (%s,%s,%s,%s,now())",
+                (doc_id, "temp_user", filename, "uploaded")
             )
 
+        POOL.submit(process_document, doc_id, path)
+
         return jsonify({
-            "status": "success",
+            "status": "processing",
             "document_id": doc_id
-        })
+        }), 202
 
     except Exception as e:
         print("UPLOAD ERROR:", e)
         return jsonify({"error": str(e)}), 500
 
+@app.route("/status/<doc_id>")
+def document_status(doc_id):
+    with db_cursor() as cur:
+        # A job lost to a worker restart would otherwise stay "uploaded" or
+        # "processing" forever
+        cur.execute("""
+            UPDATE documents SET status='failed', status_updated_at=now()
+            WHERE id=%s
+              AND (
+                (status='uploaded'
+                 AND COALESCE(status_updated_at, '-infinity') < now() - %s * interval '1 minute')
+                OR (status='processing'
+                 AND COALESCE(status_updated_at, '-infinity') < now() - %s * interval '1 minute')
+              )
+        """, (doc_id, QUEUE_TIMEOUT_MINUTES, PROCESSING_TIMEOUT_MINUTES))
+
+        cur.execute(
+            "SELECT status FROM documents WHERE id=%s",
+            (doc_id,)
+        )
+        row = cur.fetchone()
+
+    if not row:
+        return jsonify({"status": "error", "message": "Document not found."}), 404
+
+    return jsonify({
+        "status": "success",
+        "document_id": doc_id,
+        "document_status": row[0]
+    })
+
 @app.route("/summarize/<doc_id>")
 def summarize(doc_id):
-    cur = conn.cursor()
-
     # ---- Check cache ----
-    cur.execute(
-        "SELECT summary_text FROM summaries WHERE document_id=%s",
-        (doc_id,)
-    )
-    row = cur.fetchone()
+    with db_cursor() as cur:
+        cur.execute(
+            "SELECT summary_text FROM summaries WHERE document_id=%s",
+            (doc_id,)
+        )
+        row = cur.fetchone()
 
     if row:
         final_summary = row[0]
         return render_template(
             "summary.html",
-            summary_html=markdown2.markdown(final_summary)
+            summary_html=MD(final_summary)
         )
 
     # ---- Pull ALL text from DB ----
-    cur.execute(
-        "SELECT content FROM embeddings WHERE document_id=%s",
-        (doc_id,)
-    )
-    all_text = " ".join(r[0] for r in cur.fetchall())
+    all_text = get_prompt_text(doc_id)
 
     if not all_text.strip():
         return render_template(
             "summary.html",
-            summary_html=markdown2.markdown("No content available to summarize.")
+            summary_html=MD("No content available to summarize.")
         )
 
     # ---- LLM summary call ----
@@ -172,14 +593,15 @@ def summarize(doc_id):
     final_summary = groq_generate(prompt)
 
     # ---- Cache summary ----
-    cur.execute(
-        "INSERT INTO summaries (document_id, summary_text) VALUES (%s,%s)",
-        (doc_id, final_summary)
-    )
+    with db_cursor() as cur:
+        cur.execute(
+            "INSERT INTO summaries (document_id, summary_text) VALUES (%s,%s)",
+            (doc_id, final_summary)
+        )
 
     return render_template(
         "summary.html",
-        summary_html=markdown2.markdown(final_summary)
+        summary_html=MD(final_summary)
     )
 
 
@@ -187,12 +609,7 @@ def summarize(doc_id):
 @app.route("/generate_flashcards/<doc_id>")
 def generate_flashcards(doc_id):
     try:
-        cur = conn.cursor()
-        cur.execute(
-            "SELECT content FROM embeddings WHERE document_id=%s LIMIT 12",
-            (doc_id,)
-        )
-        text = " ".join(row[0] for row in cur.fetchall())
+        text = get_prompt_text(doc_id)
 
         if not text.strip():
             raise RuntimeError("No content available to generate flashcards.")
@@ -217,18 +634,16 @@ def generate_flashcards(doc_id):
         response = groq_generate(prompt).strip()
 
         # --- SAFE JSON EXTRACTION ---
-        import json, re
-
-        match = re.search(r"\[.*\]", response, re.DOTALL)
-        if not match:
+        start = response.find("[")
+        end = response.rfind("]") + 1
+        if start == -1 or end <= start:
             raise RuntimeError("Model did not return valid JSON.")
 
-        json_text = match.group()
-        flashcards = json.loads(json_text)
+        flashcards = orjson.loads(response[start:end])
 
         for card in flashcards:
-            card["question"] = markdown2.markdown(card["question"])
-            card["answer"] = markdown2.markdown(card["answer"])
+            card["question"] = render_card_text(card["question"])
+            card["answer"] = render_card_text(card["answer"])
 
         return render_template(
             "flashcards.html",
@@ -252,18 +667,34 @@ def ask_question(doc_id):
     if not question:
         return jsonify({"error": "No question"}), 400
 
-    q_emb = str(embed_text(question))
+    q_vec = embed_question(question)
 
-    cur = conn.cursor()
-    cur.execute("""
-        SELECT content
-        FROM embeddings
-        WHERE document_id = %s
-        ORDER BY embedding <-> %s::vector
-        LIMIT 5
-    """, (doc_id, q_emb))
+    cached_answer = get_cached_answer(doc_id, q_vec)
+    if cached_answer:
+        return jsonify({
+            "status": "success",
+            "answer": cached_answer
+        })
+
+    with db_cursor() as cur:
+        cur.execute("""
+            SELECT content
+            FROM embeddings
+            WHERE document_id = %s
+            ORDER BY embedding <-> %s::vector
+            LIMIT 5
+        """, (doc_id, q_vec))
+        rows = cur.fetchall()
+
+    # Unknown, queued or still-processing document: don't ask the model, and
+    # don't cache a "don't know" answer for an hour
+    if not rows:
+        return jsonify({
+            "status": "success",
+            "answer": "I'm sorry, I couldn't find any relevant information in the document to answer that."
+        })
 
-    context = "\n\n".join(row[0] for row in cur.fetchall())
+    context = "\n\n".join(row[0] for row in rows)
 
     prompt = f"""
     Answer ONLY using the context below.
@@ -276,11 +707,12 @@ def ask_question(doc_id):
     {question}
     """
 
-    answer = groq_generate(prompt)
+    answer_html = MD(groq_generate(prompt))
+    cache_answer(doc_id, q_vec, answer_html)
 
     return jsonify({
         "status": "success",
-        "answer": markdown2.markdown(answer)
+        "answer": answer_html
     })
 
 @app.route("/chat/<doc_id>")
@@ -288,5 +720,7 @@ def chat_page(doc_id):
     return render_template("chat.html")
 
 # --------------------------------------------------
-if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=10000)
+# No `python app.py` entry point: the PDF worker pool's child processes
+# re-run the __main__ script, which here would reconnect to Postgres and
+# reload the embedding model in every worker. Start the app with
+# `gunicorn app:app`, or `flask --app app run --port 10000` for development.
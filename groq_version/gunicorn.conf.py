@@ -0,0 +1,17 @@
+# Gunicorn settings, picked up automatically when running `gunicorn app:app`
+# from this directory. Each worker process serves several requests at once on
+# threads, so a slow PDF upload or LLM call no longer blocks other users.
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '10000')}"
+# Every worker loads its own copy of torch + MiniLM, so keep the process count
+# low on small instances and get concurrency from threads instead
+workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+# Workers inherit this, so pdf_worker can split the CPUs between them
+os.environ["WEB_CONCURRENCY"] = str(workers)
+worker_class = "gthread"
+# Each thread borrows its own Postgres connection from app.DB_POOL, which is
+# sized from GUNICORN_THREADS (override with DB_POOL_SIZE)
+threads = int(os.getenv("GUNICORN_THREADS", "8"))
+# LLM calls and PDF processing can take a while
+timeout = 120
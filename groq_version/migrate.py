@@ -0,0 +1,67 @@
+import os
+import psycopg2
+from dotenv import load_dotenv
+
+# --------------------------------------------------
+# ONE-OFF SCHEMA MIGRATION
+# --------------------------------------------------
+# Run once per deploy, before starting gunicorn:  python migrate.py
+# Kept out of app.py so gunicorn workers don't race on DDL at boot, and the
+# indexes are built CONCURRENTLY so embedding inserts aren't locked out.
+load_dotenv()
+
+INDEXES = {
+    # ANN index so similarity search doesn't sequential-scan every chunk
+    "embeddings_hnsw": """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS embeddings_hnsw
+        ON embeddings USING hnsw (embedding vector_l2_ops)
+        WITH (m = 16, ef_construction = 64)
+    """,
+    "embeddings_document_id": """
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS embeddings_document_id
+        ON embeddings (document_id)
+    """,
+}
+
+def migrate():
+    conn = psycopg2.connect(os.getenv("SUPABASE_DB_URL"), sslmode="require")
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction block
+    conn.autocommit = True
+
+    try:
+        with conn.cursor() as cur:
+            cur.execute("ALTER TABLE documents ADD COLUMN IF NOT EXISTS status TEXT DEFAULT 'uploaded'")
+            cur.execute("ALTER TABLE documents ADD COLUMN IF NOT EXISTS text_content TEXT")
+            cur.execute("ALTER TABLE documents ADD COLUMN IF NOT EXISTS status_updated_at TIMESTAMPTZ")
+            # Chunks picked for prompts of documents too long to send whole
+            cur.execute("ALTER TABLE documents ADD COLUMN IF NOT EXISTS representative_text TEXT")
+            # Position of each chunk in its document, so chunks can be read back in order
+            cur.execute("ALTER TABLE embeddings ADD COLUMN IF NOT EXISTS chunk_index INTEGER")
+            # Documents from before background processing were embedded during
+            # the upload request, but the status column defaulted them to "uploaded"
+            cur.execute("""
+                UPDATE documents d SET status='processed', status_updated_at=now()
+                WHERE status='uploaded'
+                  AND status_updated_at IS NULL
+                  AND EXISTS (SELECT 1 FROM embeddings e WHERE e.document_id = d.id)
+            """)
+
+            # A failed concurrent build leaves an INVALID index behind that
+            # IF NOT EXISTS would skip; drop it so it gets rebuilt
+            cur.execute("""
+                SELECT c.relname
+                FROM pg_index i
+                JOIN pg_class c ON c.oid = i.indexrelid
+                WHERE NOT i.indisvalid AND c.relname = ANY(%s)
+            """, (list(INDEXES),))
+            for (name,) in cur.fetchall():
+                cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+            for name, ddl in INDEXES.items():
+                print("CREATING INDEX:", name)
+                cur.execute(ddl)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    migrate()
@@ -0,0 +1,61 @@
+"""
+PDFium text extraction for the PDF worker processes.
+
+Kept apart from app.py so worker processes only import pypdfium2. The pool
+uses a forkserver that preloads just this module, so workers are never forked
+from the web process with its live gRPC/database connections, models and threads.
+Children still re-run the __main__ script, so app.py must not be started as
+`python app.py`; serve it with gunicorn or `flask run`.
+"""
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pypdfium2 as pdfium
+
+# Every gunicorn worker process starts its own pool, so share the CPUs between them
+PDF_WORKERS = int(os.getenv(
+    "PDF_WORKERS",
+    max(1, (os.cpu_count() or 1) // int(os.getenv("WEB_CONCURRENCY", "1")))
+))
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def extract_page_range(path, start, stop):
+    """Extracts the text of pages [start, stop), closing native handles as it goes."""
+    pdf = pdfium.PdfDocument(path)
+    try:
+        pages_text = []
+        for index in range(start, stop):
+            page = pdf[index]
+            textpage = page.get_textpage()
+            pages_text.append(textpage.get_text_range())
+            textpage.close()
+            page.close()
+        return pages_text
+    finally:
+        pdf.close()
+
+
+def get_pool():
+    """Returns the long-lived PDF worker pool, starting it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload([__name__])
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=context)
+        return _pool
+
+
+def extract_pages_in_parallel(path, page_count):
+    """Splits the PDF into one page range per worker and returns page texts in order."""
+    step = -(-page_count // min(PDF_WORKERS, page_count))  # ceiling division
+    futures = [
+        get_pool().submit(extract_page_range, path, start, min(start + step, page_count))
+        for start in range(0, page_count, step)
+    ]
+    return [text for future in futures for text in future.result()]